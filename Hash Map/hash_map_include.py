@@ -1,5 +1,7 @@
 # Data Structures to be used for implementing the hash maps
 
+from zlib import crc32
+
 # -------------- Used by both HashMaps (SC & OA)  -------------- #
 
 class DynamicArrayException(Exception):
@@ -10,7 +12,7 @@ class DynamicArray:
     """
     Class implementing a Dynamic Array
     Supported methods are:
-    append, pop, swap, get_at_index, set_at_index, length
+    append, extend, pop, swap, get_at_index, set_at_index, length
     """
 
     def __init__(self, arr=None) -> None:
@@ -39,6 +41,10 @@ class DynamicArray:
         """Add new element at the end of the array."""
         self._data.append(value)
 
+    def extend(self, values) -> None:
+        """Add every element of an iterable at the end of the array."""
+        self._data.extend(values)
+
     def pop(self):
         """Remove element from end of the array and return it."""
         return self._data.pop()
@@ -92,6 +98,14 @@ def hash_function_2(key: str) -> int:
     return hash
 
 
+def hash_function_3(key: str) -> int:
+    """Optional hash function #3, passed as function=: CRC-32 of the key's UTF-8 bytes"""
+    # zlib's crc32 walks the bytes in compiled C, so the per-byte loop never runs in the
+    # interpreter, and unlike the sums above it spreads anagrams and shuffled keys apart;
+    # the maps keep each entry's hash, so a stored key is only encoded once, when it is put
+    return crc32(str(key).encode())
+
+
 # --------- For use in Separate Chaining (SC) HashMap  --------- #
 
 class SLNode:
@@ -99,11 +113,14 @@ class SLNode:
     Singly Linked List node for use in a hash map
     """
 
-    def __init__(self, key: str, value: object, next: "SLNode" = None) -> None:
-        """Initialize node given a key and value."""
+    __slots__ = ('key', 'value', 'next', 'hash')
+
+    def __init__(self, key: str, value: object, next: "SLNode" = None, hash: int = None) -> None:
+        """Initialize node given a key, value and optionally the key's hash."""
         self.key = key
         self.value = value
         self.next = next
+        self.hash = hash
 
     def __str__(self) -> str:
         """Override string method to provide more readable output."""
@@ -137,7 +154,8 @@ class LinkedListIterator:
 class LinkedList:
     """
     Class implementing a Singly Linked List
-    Supported methods are: insert, remove, contains, length, iterator
+    Supported methods are: insert, insert_node, remove, remove_with_hash, contains, contains_with_hash,
+    length, iterator
     """
 
     def __init__(self) -> None:
@@ -164,9 +182,15 @@ class LinkedList:
         """Return an iterator for the list, starting at the head."""
         return LinkedListIterator(self._head)
 
-    def insert(self, key: str, value: object) -> None:
+    def insert(self, key: str, value: object, hash: int = None) -> None:
         """Insert new node at front of the list."""
-        self._head = SLNode(key, value, self._head)
+        self._head = SLNode(key, value, self._head, hash)
+        self._size += 1
+
+    def insert_node(self, node: SLNode) -> None:
+        """Insert an existing node at front of the list."""
+        node.next = self._head
+        self._head = node
         self._size += 1
 
     def remove(self, key: str) -> bool:
@@ -177,7 +201,26 @@ class LinkedList:
         previous, node = None, self._head
         while node:
 
-            if node.key == key:
+            if node.key is key or node.key == key:
+                if previous:
+                    previous.next = node.next
+                else:
+                    self._head = node.next
+                self._size -= 1
+                return True
+
+            previous, node = node, node.next
+        return False
+
+    def remove_with_hash(self, hash: int, key: str) -> bool:
+        """
+        Remove first node with matching hash and key.
+        Return True if removal was successful, False otherwise.
+        """
+        previous, node = None, self._head
+        while node:
+
+            if node.key is key or (node.hash == hash and node.key == key):
                 if previous:
                     previous.next = node.next
                 else:
@@ -199,23 +242,19 @@ class LinkedList:
             node = node.next
         return node
 
+    def contains_with_hash(self, hash: int, key: str) -> SLNode:
+        """
+        Return node with matching hash and key, or None if no match.
+        Checking for the same key object, then comparing the cached hashes,
+        skips most full key comparisons.
+        """
+        node = self._head
+        while node:
+            if node.key is key or (node.hash == hash and node.key == key):
+                return node
+            node = node.next
+        return None
+
     def length(self) -> int:
         """Return the length of the list."""
         return self._size
-
-
-# ---------- For use in Open Addressing (OA) HashMap  ---------- #
-
-class HashEntry:
-
-    def __init__(self, key: str, value: object) -> None:
-        """Initialize an entry for use in a hash map."""
-        self.key = key
-        self.value = value
-
-        # Set this value to True when you "delete" a HashEntry
-        self.is_tombstone = False
-
-    def __str__(self) -> str:
-        """Override string method to provide more readable output."""
-        return f"K: {self.key} V: {self.value} TS: {self.is_tombstone}"
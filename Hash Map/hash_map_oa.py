@@ -1,69 +1,127 @@
 # Name: Matthew Wenzel
 # Email: wenzelma@oregonstate.edu
 # Date: 8/9/22
-# Description: Implements a Hash Map class with a Dynamic Array as the underlying data structure
-#              and uses Open Addressing with Quadratic Probing for collision resolution
+# Description: Implements a Hash Map class with a Python list as the underlying data structure
+#              and uses Open Addressing with Robin Hood linear probing for collision resolution
 
 
-from hash_map_include import (DynamicArray, HashEntry,
+from hash_map_include import (DynamicArray,
                               hash_function_1, hash_function_2)
 
+# one-byte bucket tags stored densely apart from the keys and values: empty buckets are 0,
+# and live entries carry the high bit plus the low 7 bits of their key's hash so most
+# mismatches are rejected from the tag alone
+_LIVE = 0x80
+
+# Fibonacci hashing: multiplying a hash by 2**64 / golden ratio and keeping the top
+# bits of the 64-bit product spreads keys evenly over a power-of-two table, so an
+# index is a multiply and a shift rather than a division
+_FIBONACCI = 0x9E3779B97F4A7C15
+_MASK_64 = (1 << 64) - 1
+
+# smallest capacity the table is allowed to shrink to
+_MIN_CAPACITY = 16
+
+
+# hash_map_oa_c.pyx mirrors this function as a compiled copy; any change to the probe
+# (its arguments, early exits or key comparison) must be made in both places
+def _probe_oa(table: tuple, max_dfb: int, key: str, key_hash: int) -> int:
+    """
+    takes a hash map's probe table (tags, keys, hashes and distances), its longest distance
+    from home, a key and its hash as parameters and uses linear probing to find the index
+    position of the key in the hash map.
+    If the key is not in the hash map, -1 is returned instead
+    """
+    tags, keys, hashes, dfbs = table
+    tag = _LIVE | (key_hash & 0x7F)
+    # the mask and shift both follow from the capacity, which is the length of the tags
+    capacity = len(tags)
+    mask, shift = capacity - 1, 65 - capacity.bit_length()
+
+    # use Fibonacci hashing to calculate the home index position for the given key
+    index = ((key_hash * _FIBONACCI) & _MASK_64) >> shift
+    dfb = 0
+    # Robin Hood insertion never leaves an entry closer to its home than a key that
+    # probed past it, so the key can't be beyond an empty bucket, beyond an entry closer
+    # to its home than we are to ours, or further than the longest distance in the table
+    while dfb <= max_dfb:
+        slot = tags[index]
+        if not slot or dfbs[index] < dfb:
+            break
+        # only read the stored key if the tag matches, then check for the same
+        # key object before comparing the cached hash and the key itself
+        if slot == tag:
+            stored = keys[index]
+            if stored is key or (hashes[index] == key_hash and stored == key):
+                return index
+        # use linear probing to calculate the next index position
+        index = (index + 1) & mask
+        dfb += 1
+    return -1
+
+
+# use the compiled probe loop from hash_map_oa_c.pyx when it has been built,
+# otherwise keep the pure-Python version above
+try:
+    from hash_map_oa_c import _probe_oa
+except ImportError:
+    pass
+
 
 class HashMap:
-    def __init__(self, capacity: int = 11, function: callable = hash_function_1) -> None:
+    def __init__(self, capacity: int = 11, function: callable = hash) -> None:
         """
         Initialize new HashMap that uses
-        quadratic probing for collision resolution
-        """
-        self._buckets = DynamicArray()
-
-        # capacity must be a prime number
-        self._capacity = self._next_prime(capacity)
-        for _ in range(self._capacity):
-            self._buckets.append(None)
-
+        Robin Hood linear probing for collision resolution
+        """
+        # capacity must be a power of two; _shift keeps the top bits of a 64-bit product
+        self._capacity = self._next_power_of_two(capacity)
+        self._shift = 65 - self._capacity.bit_length()
+
+        # buckets are split into parallel plain lists of keys, values and hashes plus the
+        # tag array, so probing only reads the dense tags and a hit reads the key directly
+        # rather than going through a separately allocated entry object
+        self._keys = [None] * self._capacity
+        self._values = [None] * self._capacity
+        self._hashes = [None] * self._capacity
+        self._tags = bytearray(self._capacity)
+
+        # each entry's distance from its home bucket, and the longest such distance,
+        # which bounds how far any lookup has to probe
+        self._dfbs = [0] * self._capacity
+        self._max_dfb = 0
+
+        # the arrays a lookup reads, bundled so each lookup fetches one attribute and passes
+        # one argument for all of them; it must be rebuilt whenever any of them is reassigned
+        self._table = (self._tags, self._keys, self._hashes, self._dfbs)
+
+        # the default is Python's built-in hash, which strings compute once in C and cache
+        # on the object; the sample hash functions can still be passed in for repeatable
+        # results, and negative hashes are folded into range by the 64-bit mask
         self._hash_function = function
         self._size = 0
 
+        # number of empty buckets, and the size at which put resizes the table
+        # (size / capacity >= 0.5 without the division)
+        self._empty = self._capacity
+        self._resize_threshold = self._capacity // 2
+
     def __str__(self) -> str:
         """
         Override string method to provide more readable output
         """
-        out = ''
-        for i in range(self._buckets.length()):
-            out += str(i) + ': ' + str(self._buckets[i]) + '\n'
-        return out
-
-    def _next_prime(self, capacity: int) -> int:
-        """
-        Increment from given number to find the closest prime number
-        """
-        if capacity % 2 == 0:
-            capacity += 1
-
-        while not self._is_prime(capacity):
-            capacity += 2
-
-        return capacity
+        keys, values = self._keys, self._values
+        # join builds the output in one pass instead of re-copying it for every line
+        return ''.join(f'{i}: K: {keys[i]} V: {values[i]}\n' if tag
+                       else f'{i}: None\n'
+                       for i, tag in enumerate(self._tags))
 
     @staticmethod
-    def _is_prime(capacity: int) -> bool:
+    def _next_power_of_two(capacity: int) -> int:
         """
-        Determine if given integer is a prime number and return boolean
+        Round given number up to the closest power of two, no smaller than the minimum capacity
         """
-        if capacity == 2 or capacity == 3:
-            return True
-
-        if capacity == 1 or capacity % 2 == 0:
-            return False
-
-        factor = 3
-        while factor ** 2 <= capacity:
-            if capacity % factor == 0:
-                return False
-            factor += 2
-
-        return True
+        return max(_MIN_CAPACITY, 1 << (capacity - 1).bit_length())
 
     def get_size(self) -> int:
         """
@@ -85,20 +143,83 @@ class HashMap:
         If the key already exists, its value is updated. If not, a new key / value pair is added.
         """
         # if the load factor is equal to or greater than 0.5, resize the hash map
-        if self.table_load() >= 0.5:
+        if self._size >= self._resize_threshold:
             self.resize_table(self._capacity * 2)
 
-        # find the index position and bucket corresponding to the key
-        index = self.get_bucket_index(key)
-        bucket = self._buckets[index]
+        # find the index position of the key, if it is already in the hash map; the probe
+        # is a module-level function handed the table's state, so it reads plain locals
+        key_hash = self._hash_function(key)
+        index = _probe_oa(self._table, self._max_dfb, key, key_hash)
 
-        # if the bucket is not empty and not a tombstone, update its value
-        if bucket and not bucket.is_tombstone:
-            bucket.value = value
-        # else, insert the key / value pair into the empty bucket
+        # if the hash map holds the key, update its value
+        if index >= 0:
+            self._values[index] = value
+        # else, insert the new key / value pair
         else:
-            self._buckets[index] = HashEntry(key, value)
-            self._size += 1
+            self._insert(key, value, key_hash)
+
+    def put_many(self, keys: list, values: list) -> None:
+        """
+        Takes a list of keys and a matching list of values and updates the hash map with each
+        key / value pair in order, as put would, but resizes the table at most once up front.
+        Raises ValueError if the two lists differ in length.
+        """
+        # check the lengths first, so a mismatch leaves the hash map untouched
+        if len(keys) != len(values):
+            raise ValueError(f'put_many got {len(keys)} keys but {len(values)} values')
+
+        # grow once so every key can be added without crossing the 0.5 load factor
+        if self._size + len(keys) > self._resize_threshold:
+            self.resize_table((self._size + len(keys)) * 2)
+
+        # hash every key in one pass, then bind the table's state to locals for the loop
+        key_hashes = list(map(self._hash_function, keys))
+        table, table_values, insert = self._table, self._values, self._insert
+
+        for key, value, key_hash in zip(keys, values, key_hashes):
+            # the table is already big enough, so there is no load factor check per key;
+            # the longest distance is re-read because each insert may have raised it
+            index = _probe_oa(table, self._max_dfb, key, key_hash)
+            if index >= 0:
+                table_values[index] = value
+            else:
+                insert(key, value, key_hash)
+
+    def _insert(self, key: str, value: object, key_hash: int) -> None:
+        """
+        Inserts a key / value pair that is known not to be in the hash map using Robin Hood
+        probing: walking forward from the home bucket, whenever the entry being carried is
+        further from its home than the resident entry, they swap places and the displaced
+        entry is carried on. This keeps every entry's distance from home close to the average.
+        """
+        keys, values, hashes, tags, dfbs = self._keys, self._values, self._hashes, self._tags, self._dfbs
+        mask = self._capacity - 1
+        tag = _LIVE | (key_hash & 0x7F)
+
+        index = ((key_hash * _FIBONACCI) & _MASK_64) >> self._shift
+        dfb, max_dfb = 0, self._max_dfb
+        while True:
+            slot = tags[index]
+            # an empty bucket takes the carried entry
+            if not slot:
+                keys[index], values[index], hashes[index] = key, value, key_hash
+                tags[index], dfbs[index] = tag, dfb
+                break
+            # a live entry closer to its home than the carried one gives up its bucket
+            if dfbs[index] < dfb:
+                if dfb > max_dfb:
+                    max_dfb = dfb
+                keys[index], key = key, keys[index]
+                values[index], value = value, values[index]
+                hashes[index], key_hash = key_hash, hashes[index]
+                tags[index], tag = tag, slot
+                dfbs[index], dfb = dfb, dfbs[index]
+            index = (index + 1) & mask
+            dfb += 1
+
+        self._max_dfb = max(max_dfb, dfb)
+        self._size += 1
+        self._empty -= 1
 
     def table_load(self) -> float:
         """
@@ -110,12 +231,8 @@ class HashMap:
         """
         Returns the number of empty buckets in the hash table.
         """
-        empty_count = 0
-        # iterate through the hash map incrementing the empty bucket count for each empty bucket found
-        for num in range(self._capacity):
-            if self._buckets[num] is None:
-                empty_count += 1
-        return empty_count
+        # the count is kept up to date by _insert, remove, clear and resize_table
+        return self._empty
 
     def resize_table(self, new_capacity: int) -> None:
         """
@@ -126,34 +243,46 @@ class HashMap:
         if new_capacity < self._size:
             return
 
-        # if the new capacity is not a prime number, increment it to the next prime
-        if not self._is_prime(new_capacity):
-            new_capacity = self._next_prime(new_capacity)
+        # if the new capacity is not a power of two, round it up to the next one
+        new_capacity = self._next_power_of_two(new_capacity)
 
-        # create an array of all the key / value pairs in the hashmap
-        key_val_arr = self.get_keys_and_values()
+        # keep doubling while the entries would push the table past the load factor put enforces
+        while (self._size - 1) * 2 >= new_capacity:
+            new_capacity *= 2
 
-        # update the capacity and then clear out all the buckets in the hash map
+        self._rehash_into(new_capacity)
+
+    def _rehash_into(self, new_capacity: int) -> None:
+        """
+        Moves every live entry straight into a new table of the given capacity,
+        skipping the load factor check, lookups and rehashing that put would go through
+        """
+        old_keys, old_values, old_hashes, old_tags = self._keys, self._values, self._hashes, self._tags
+
+        # switch to the new capacity and start from an empty table; clear also rebuilds
+        # _table, which has to be redone whenever the arrays in it are reassigned
         self._capacity = new_capacity
+        self._shift = 65 - new_capacity.bit_length()
+        self._resize_threshold = new_capacity // 2
         self.clear()
 
-        # iterate through the key / value array adding each pair to the new hash map with updated capacity
-        for num in range(key_val_arr.length()):
-            key, val = key_val_arr[num]
-            self.put(key, val)
+        # every key being moved is unique, so each one can go straight to _insert
+        insert = self._insert
+        for key, value, key_hash, tag in zip(old_keys, old_values, old_hashes, old_tags):
+            if tag & _LIVE:
+                insert(key, value, key_hash)
 
     def get(self, key: str) -> object:
         """
         Returns the value associated with the given key.
         If the key is not in the hash map, the method returns None.
         """
-        # find the index position and bucket corresponding to the key
-        index = self.get_bucket_index(key)
-        bucket = self._buckets[index]
+        # find the index position corresponding to the key
+        index = _probe_oa(self._table, self._max_dfb, key, self._hash_function(key))
 
-        # if the bucket is not empty and not a tombstone, return its value
-        if bucket and not bucket.is_tombstone:
-            return bucket.value
+        # if the hash map holds the key, return its value
+        if index >= 0:
+            return self._values[index]
         else:
             return None
 
@@ -165,12 +294,11 @@ class HashMap:
         if self._size == 0:
             return False
 
-        # find the index position and bucket corresponding to the key
-        index = self.get_bucket_index(key)
-        bucket = self._buckets[index]
+        # find the index position corresponding to the key
+        index = _probe_oa(self._table, self._max_dfb, key, self._hash_function(key))
 
-        # if the bucket is not empty and not a tombstone, return True
-        if bucket and not bucket.is_tombstone:
+        # if the hash map holds the key, return True
+        if index >= 0:
             return True
         else:
             return False
@@ -180,15 +308,29 @@ class HashMap:
         Removes the given key and its associated value from the hash map.
         If the key is not in the hash map, the method does nothing.
         """
-        # find the index position and bucket corresponding to the key
-        index = self.get_bucket_index(key)
-        bucket = self._buckets[index]
-
-        # if the bucket is not empty and not a tombstone:
-        if bucket and not bucket.is_tombstone:
-            # set the tombstone value to True and decrement the size of the hash map
-            bucket.is_tombstone = True
+        # find the index position corresponding to the key
+        index = _probe_oa(self._table, self._max_dfb, key, self._hash_function(key))
+
+        # if the hash map holds the key:
+        if index >= 0:
+            keys, values, hashes, tags, dfbs = self._keys, self._values, self._hashes, self._tags, self._dfbs
+            mask = self._capacity - 1
+
+            # backward-shift deletion: pull each following entry that is away from its home
+            # back one bucket, until reaching an empty bucket or an entry already at its home,
+            # so no tombstone is left behind for later probes to step over
+            following = (index + 1) & mask
+            while tags[following] and dfbs[following]:
+                keys[index], values[index], hashes[index] = keys[following], values[following], hashes[following]
+                tags[index], dfbs[index] = tags[following], dfbs[following] - 1
+                index = following
+                following = (following + 1) & mask
+
+            # empty the last bucket of the shifted run and decrement the size of the hash map
+            keys[index] = values[index] = hashes[index] = None
+            tags[index], dfbs[index] = 0, 0
             self._size -= 1
+            self._empty += 1
         return
 
     def clear(self) -> None:
@@ -196,42 +338,25 @@ class HashMap:
         Clears the contents of the hash map.
         It does not change the underlying hash table capacity.
         """
-        # set the underlying array to a new empty Dynamic Array
-        self._buckets = DynamicArray()
-        # add 'None' values to the new hash map equal to the hash map's capacity
-        for _ in range(self._capacity):
-            self._buckets.append(None)
+        # set the underlying lists to 'None' values equal to the hash map's capacity
+        self._keys = [None] * self._capacity
+        self._values = [None] * self._capacity
+        self._hashes = [None] * self._capacity
+        self._tags = bytearray(self._capacity)
+        self._dfbs = [0] * self._capacity
+        self._max_dfb = 0
+        # the new arrays replace the ones bundled for lookups, so rebuild that tuple too
+        self._table = (self._tags, self._keys, self._hashes, self._dfbs)
         self._size = 0
+        self._empty = self._capacity
 
     def get_keys_and_values(self) -> DynamicArray:
         """
         Returns a dynamic array where each index contains a tuple of a key / value pair stored in the hash map.
         """
         arr = DynamicArray()
-        # increment through the hash map checking each bucket
-        for num in range(self._capacity):
-            bucket = self._buckets[num]
-            # if the bucket exists and is not a tombstone, add its key / value pair to the array
-            if bucket and not bucket.is_tombstone:
-                arr.append((bucket.key, bucket.value))
+        # add the key / value pair of every bucket whose tag marks a live entry in a single call
+        arr.extend([(key, value)
+                    for key, value, tag in zip(self._keys, self._values, self._tags) if tag & _LIVE])
         return arr
 
-    def get_bucket_index(self, key: str):
-        """
-        takes a key as a parameter and uses quadratic probing to
-        calculate the corresponding index position in the hash map
-        """
-        # use the hash function to calculate an initial index position for the given key
-        initial = self._hash_function(key) % self._capacity
-        j, index = 1, initial
-        # while a bucket exists at the current index position:
-        while self._buckets[index]:
-            # return the current index position if it contains the key
-            if self._buckets[index].key == key:
-                return index
-            # use quadratic probing to calculate the next index position
-            index = (initial + (j**2)) % self._capacity
-            j += 1
-        # return index position of empty bucket if key not found
-        return index
-
@@ -0,0 +1,60 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+# Description: Optional compiled probe loop for the Open Addressing Hash Map.
+#              hash_map_oa.py uses it when it has been built and falls back to its own
+#              pure-Python _probe_oa otherwise, so nothing requires a compiler. To build:
+#                  CFLAGS="-O3 -march=native" cythonize -i hash_map_oa_c.pyx
+
+
+from cpython.bytearray cimport PyByteArray_AS_STRING
+from cpython.long cimport PyLong_AsUnsignedLongLongMask
+from libc.stdint cimport uint64_t
+
+# same constants as hash_map_oa.py
+cdef unsigned char _LIVE = 0x80
+cdef uint64_t _FIBONACCI = 0x9E3779B97F4A7C15ULL
+
+
+def _probe_oa(tuple table, Py_ssize_t max_dfb, object key, object key_hash) -> int:
+    """
+    takes a hash map's probe table (tags, keys, hashes and distances), its longest distance
+    from home, a key and its hash as parameters and uses linear probing to find the index
+    position of the key in the hash map.
+    If the key is not in the hash map, -1 is returned instead
+    """
+    cdef bytearray tag_array = table[0]
+    cdef list keys = table[1]
+    cdef list hashes = table[2]
+    cdef list dfbs = table[3]
+
+    # the low 64 bits of the hash are all that Fibonacci hashing and the tag use, so
+    # unbounded Python ints from custom hash functions are reduced once, up front
+    cdef uint64_t hash64 = PyLong_AsUnsignedLongLongMask(key_hash)
+    cdef unsigned char *tags = <unsigned char *> PyByteArray_AS_STRING(tag_array)
+    cdef unsigned char tag = _LIVE | (hash64 & 0x7F)
+
+    # the mask and shift both follow from the capacity, which is the length of the tags
+    cdef Py_ssize_t capacity = len(tag_array)
+    cdef Py_ssize_t mask = capacity - 1
+    cdef int shift = 65
+    while capacity:
+        shift -= 1
+        capacity >>= 1
+
+    # uint64_t multiplication wraps, which is the & with the 64-bit mask in hash_map_oa.py
+    cdef Py_ssize_t index = <Py_ssize_t> ((hash64 * _FIBONACCI) >> shift)
+    cdef Py_ssize_t dfb = 0
+    cdef unsigned char slot
+    cdef object stored
+    # same early exits as the pure-Python probe: an empty bucket, an entry closer to its
+    # home than we are to ours, or the longest distance in the table
+    while dfb <= max_dfb:
+        slot = tags[index]
+        if not slot or <Py_ssize_t> dfbs[index] < dfb:
+            break
+        if slot == tag:
+            stored = keys[index]
+            if stored is key or (hashes[index] == key_hash and stored == key):
+                return index
+        index = (index + 1) & mask
+        dfb += 1
+    return -1
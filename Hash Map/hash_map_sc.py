@@ -1,68 +1,59 @@
 # Name: Matthew Wenzel
 # Email: wenzelma@oregonstate.edu
 # Date: 8/9/22
-# Description: Implements a Hash Map class with a Dynamic Array as the underlying data structure
+# Description: Implements a Hash Map class with a Python list as the underlying data structure
 #              and uses a singly linked list as chaining for collision resolution
 
 
 from hash_map_include import (DynamicArray, LinkedList,
                               hash_function_1, hash_function_2)
 
+# Fibonacci hashing: multiplying a hash by 2**64 / golden ratio and keeping the top
+# bits of the 64-bit product spreads keys evenly over a power-of-two table, so an
+# index is a multiply and a shift rather than a division
+_FIBONACCI = 0x9E3779B97F4A7C15
+_MASK_64 = (1 << 64) - 1
+
+# smallest capacity the table is allowed to shrink to
+_MIN_CAPACITY = 16
+
+
 class HashMap:
-    def __init__(self, capacity: int = 11, function: callable = hash_function_1) -> None:
+    def __init__(self, capacity: int = 11, function: callable = hash) -> None:
         """
         Initialize new HashMap that uses
         separate chaining for collision resolution
         """
-        self._buckets = DynamicArray()
+        # capacity must be a power of two; _shift keeps the top bits of a 64-bit product
+        self._capacity = self._next_power_of_two(capacity)
+        self._shift = 65 - self._capacity.bit_length()
 
-        # capacity must be a prime number
-        self._capacity = self._next_prime(capacity)
-        for _ in range(self._capacity):
-            self._buckets.append(LinkedList())
+        # buckets live in a plain list, whose C-level indexing is far cheaper
+        # than DynamicArray's Python-level bounds-checked __getitem__
+        self._buckets = [LinkedList() for _ in range(self._capacity)]
 
+        # the default is Python's built-in hash, which strings compute once in C and cache
+        # on the object; the sample hash functions can still be passed in for repeatable
+        # results, and negative hashes are folded into range by the 64-bit mask
         self._hash_function = function
         self._size = 0
 
+        # number of buckets whose chain is empty
+        self._empty = self._capacity
+
     def __str__(self) -> str:
         """
         Override string method to provide more readable output
         """
-        out = ''
-        for i in range(self._buckets.length()):
-            out += str(i) + ': ' + str(self._buckets[i]) + '\n'
-        return out
-
-    def _next_prime(self, capacity: int) -> int:
-        """
-        Increment from given number and the find the closest prime number
-        """
-        if capacity % 2 == 0:
-            capacity += 1
-
-        while not self._is_prime(capacity):
-            capacity += 2
-
-        return capacity
+        # join builds the output in one pass instead of re-copying it for every line
+        return ''.join(f'{i}: {bucket}\n' for i, bucket in enumerate(self._buckets))
 
     @staticmethod
-    def _is_prime(capacity: int) -> bool:
+    def _next_power_of_two(capacity: int) -> int:
         """
-        Determine if given integer is a prime number and return boolean
+        Round given number up to the closest power of two, no smaller than the minimum capacity
         """
-        if capacity == 2 or capacity == 3:
-            return True
-
-        if capacity == 1 or capacity % 2 == 0:
-            return False
-
-        factor = 3
-        while factor ** 2 <= capacity:
-            if capacity % factor == 0:
-                return False
-            factor += 2
-
-        return True
+        return max(_MIN_CAPACITY, 1 << (capacity - 1).bit_length())
 
     def get_size(self) -> int:
         """
@@ -83,31 +74,28 @@ class HashMap:
         Takes a key / value pair as parameters and updates the hash map with the new value.
         If the key already exists, its value is updated. If not, a new key / value pair is added.
         """
-
         # use the hash function to calculate an index position for the given key
-        index = self._hash_function(key) % self._capacity
+        key_hash = self._hash_function(key)
+        index = ((key_hash * _FIBONACCI) & _MASK_64) >> self._shift
         # use the index position to find the appropriate bucket for the key
         bucket = self._buckets[index]
         # if the bucket already contains the key, update its value
-        node = bucket.contains(key)
+        node = bucket.contains_with_hash(key_hash, key)
         if node:
             node.value = value
         # else, add a new key value pair to the bucket
         else:
-            bucket.insert(key, value)
+            if bucket.length() == 0:
+                self._empty -= 1
+            bucket.insert(key, value, key_hash)
             self._size += 1
 
     def empty_buckets(self) -> int:
         """
         Returns the number of empty buckets in the hash table.
         """
-        empty_buckets = 0
-        # iterate through the underlying array checking the length of each bucket
-        # and incrementing the empty bucket count for each empty bucket found
-        for num in range(self._capacity):
-            if self._buckets[num].length() == 0:
-                empty_buckets += 1
-        return empty_buckets
+        # the count is kept up to date by put, remove, clear and resize_table
+        return self._empty
 
     def table_load(self) -> float:
         """
@@ -120,12 +108,10 @@ class HashMap:
         Clears the contents of the hash map.
         It does not change the underlying hash table capacity.
         """
-        # set the underlying array to an empty dynamic array
-        self._buckets = DynamicArray()
-        # add empty linked lists to the new hash map equal to the hash map's capacity
-        for num in range(self._capacity):
-            self._buckets.append(LinkedList())
+        # set the underlying list to empty linked lists equal to the hash map's capacity
+        self._buckets = [LinkedList() for _ in range(self._capacity)]
         self._size = 0
+        self._empty = self._capacity
 
     def resize_table(self, new_capacity: int) -> None:
         """
@@ -136,21 +122,33 @@ class HashMap:
         if new_capacity < 1:
             return
 
-        # if the new capacity is not a prime number, increment it to the next prime
-        if not self._is_prime(new_capacity):
-            new_capacity = self._next_prime(new_capacity)
+        # if the new capacity is not a power of two, round it up to the next one
+        new_capacity = self._next_power_of_two(new_capacity)
 
-        # create an array of all the key / value pairs in the hash map
-        key_val_arr = self.get_keys_and_values()
+        self._rehash_into(new_capacity)
 
-        # update the capacity and then clear out all the buckets in the hash map
-        self._capacity = new_capacity
-        self.clear()
+    def _rehash_into(self, new_capacity: int) -> None:
+        """
+        Moves every node straight into a new table of the given capacity,
+        re-linking the existing nodes instead of allocating new ones
+        """
+        new_buckets = [LinkedList() for _ in range(new_capacity)]
+        shift = 65 - new_capacity.bit_length()
+        empty = new_capacity
 
-        # iterate through the key / value array adding each pair to the new hash map with updated capacity
-        for num in range(key_val_arr.length()):
-            key, val = key_val_arr[num]
-            self.put(key, val)
+        for num in range(self._capacity):
+            # the iterator steps past a node before it is returned, so re-linking it is safe;
+            # each node's cached hash places it without calling the hash function again
+            for node in self._buckets[num]:
+                bucket = new_buckets[((node.hash * _FIBONACCI) & _MASK_64) >> shift]
+                if bucket.length() == 0:
+                    empty -= 1
+                bucket.insert_node(node)
+
+        self._buckets = new_buckets
+        self._capacity = new_capacity
+        self._shift = shift
+        self._empty = empty
 
     def get(self, key: str) -> object:
         """
@@ -158,11 +156,12 @@ class HashMap:
         If the key is not in the hash map, the method returns None.
         """
         # use the hash function to calculate an index position for the given key
-        index = self._hash_function(key) % self._capacity
+        key_hash = self._hash_function(key)
+        index = ((key_hash * _FIBONACCI) & _MASK_64) >> self._shift
         # use the index position to find the appropriate bucket for the key
         bucket = self._buckets[index]
         # if the bucket contains the key, return its value
-        node = bucket.contains(key)
+        node = bucket.contains_with_hash(key_hash, key)
         if node:
             return node.value
         # else, return None
@@ -174,11 +173,12 @@ class HashMap:
         Returns True if the given key is in the hash map, otherwise it returns False.
         """
         # use the hash function to calculate an index position for the given key
-        index = self._hash_function(key) % self._capacity
+        key_hash = self._hash_function(key)
+        index = ((key_hash * _FIBONACCI) & _MASK_64) >> self._shift
         # use the index position to find the appropriate bucket for the key
         bucket = self._buckets[index]
         # if the bucket contains the key, return True, else return False
-        node = bucket.contains(key)
+        node = bucket.contains_with_hash(key_hash, key)
         return node is not None
 
     def remove(self, key: str) -> None:
@@ -187,24 +187,24 @@ class HashMap:
         If the key is not in the hash map, the method does nothing.
         """
         # use the hash function to calculate an index position for the given key
-        index = self._hash_function(key) % self._capacity
+        key_hash = self._hash_function(key)
+        index = ((key_hash * _FIBONACCI) & _MASK_64) >> self._shift
         # use the index position to find the appropriate bucket for the key
         bucket = self._buckets[index]
-        # remove the key from the bucket and decrement the size of the hash map if successful
-        if bucket.remove(key):
+        # remove the key from the bucket, comparing the cached hashes before the keys,
+        # and decrement the size of the hash map if successful
+        if bucket.remove_with_hash(key_hash, key):
             self._size -= 1
+            if bucket.length() == 0:
+                self._empty += 1
 
     def get_keys_and_values(self) -> DynamicArray:
         """
         Returns a dynamic array where each index contains a tuple of a key / value pair stored in the hash map.
         """
         arr = DynamicArray()
-        # iterate through each bucket in the hash map
-        for num in range(self._capacity):
-            bucket = self._buckets[num]
-            # for every node in the bucket, add their key / value pairs to the array
-            for node in bucket:
-                arr.append((node.key, node.value))
+        # add the key / value pairs of every node in every bucket in a single call
+        arr.extend([(node.key, node.value) for bucket in self._buckets for node in bucket])
         return arr
 
 